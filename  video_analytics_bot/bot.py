@@ -80,7 +80,8 @@ async def cmd_stats(message: types.Message):
         video_count = await db.execute_query("SELECT COUNT(*) FROM videos;")
         
         # Количество снапшотов
-        snapshot_count = await db.execute_query("SELECT COUNT(*) FROM video_snapshots;")
+        snapshot_count = await db.execute_query("SELECT COUNT(*) FROM video_snapshots WHERE resolution = 'hour';")
+        daily_snapshot_count = await db.execute_query("SELECT COUNT(*) FROM video_snapshots WHERE resolution = 'day';")
         
         # Количество креаторов
         creator_count = await db.execute_query("SELECT COUNT(DISTINCT creator_id) FROM videos;")
@@ -90,6 +91,7 @@ async def cmd_stats(message: types.Message):
 
 • Видео: {video_count:,}
 • Почасовых снапшотов: {snapshot_count:,}
+• Дневных снапшотов (сжатых): {daily_snapshot_count:,}
 • Уникальных креаторов: {creator_count:,}
 
 База данных готова к работе!
@@ -114,8 +116,9 @@ async def handle_user_query(message: types.Message):
     processing_msg = await message.answer("⏳ Обрабатываю запрос...")
     
     try:
-        # Генерируем SQL запрос через LLM
-        sql_query, explanation = await llm_service.generate_sql_from_text(user_query)
+        # Генерируем SQL запрос через LLM с учетом сжатых до дней периодов
+        storage_ranges = await db.get_snapshot_storage_ranges()
+        sql_query, explanation = await llm_service.generate_sql_from_text(user_query, storage_ranges)
         logger.info(f"SQL запрос: {sql_query}")
         logger.info(f"Объяснение: {explanation}")
         
@@ -29,7 +29,18 @@ class LLMConfig:
     ollama_host: str = os.getenv('OLLAMA_HOST', 'http://localhost:11434')
     ollama_model: str = os.getenv('OLLAMA_MODEL', 'llama2:13b')
 
+@dataclass
+class CompactionConfig:
+    # Почасовые снапшоты старше этого возраста сворачиваются в дневные
+    hourly_retention_days: int = int(os.getenv('SNAPSHOT_HOURLY_RETENTION_DAYS', 90))
+    # Количество видео, обрабатываемых в одной транзакции
+    batch_size: int = int(os.getenv('SNAPSHOT_COMPACTION_BATCH_SIZE', 200))
+    # Пауза между батчами (секунды), чтобы не мешать боту
+    batch_pause: float = float(os.getenv('SNAPSHOT_COMPACTION_PAUSE', 0.1))
+    lock_timeout: str = os.getenv('SNAPSHOT_COMPACTION_LOCK_TIMEOUT', '5s')
+
 # Создаем экземпляры конфигураций
 db_config = DatabaseConfig()
 bot_config = BotConfig()
-llm_config = LLMConfig()
\ No newline at end of file
+llm_config = LLMConfig()
+compaction_config = CompactionConfig()
\ No newline at end of file
@@ -2,7 +2,81 @@ import asyncpg
 import asyncio
 from datetime import datetime
 import os
-from config import db_config
+from config import db_config, compaction_config
+
+# Общая схема хранения снапшотов по уровням (используется ботом и scripts/compact_snapshots.py)
+SNAPSHOT_RESOLUTION_COLUMN_SQL = """
+    ALTER TABLE video_snapshots ADD COLUMN IF NOT EXISTS resolution VARCHAR(8) NOT NULL DEFAULT 'hour'
+"""
+
+SNAPSHOT_STORAGE_TIERS_SQL = '''
+    CREATE TABLE IF NOT EXISTS snapshot_storage_tiers (
+        day DATE PRIMARY KEY,
+        resolution VARCHAR(8) NOT NULL,
+        rows_before INTEGER NOT NULL DEFAULT 0,
+        rows_after INTEGER NOT NULL DEFAULT 0,
+        compacted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+# Частичный индекс: поиск еще не сжатых дней не сканирует сжатую историю.
+# CONCURRENTLY - чтобы построение не блокировало запись снапшотов
+SNAPSHOT_HOURLY_INDEX_SQL = '''
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_snapshots_hourly_created ON video_snapshots(created_at)
+    WHERE resolution = 'hour'
+'''
+
+# Ключ advisory-блокировки: загрузка и сжатие снапшотов не должны идти одновременно
+SNAPSHOT_MAINTENANCE_LOCK_ID = 26_001
+
+
+async def migrate_snapshot_storage(conn, lock_timeout: str = compaction_config.lock_timeout):
+    """Колонка resolution, таблица уровней хранения и частичный индекс.
+    
+    ALTER TABLE выполняется только если колонки еще нет и под lock_timeout,
+    чтобы не повиснуть в очереди блокировок. Если таблица занята, пробрасывает
+    asyncpg.exceptions.LockNotAvailableError - вызывающий решает, что делать.
+    """
+    has_column = await conn.fetchval('''
+        SELECT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'video_snapshots' AND column_name = 'resolution'
+        )
+    ''')
+    
+    async with conn.transaction():
+        await conn.execute("SELECT set_config('lock_timeout', $1, true)", lock_timeout)
+        if not has_column:
+            await conn.execute(SNAPSHOT_RESOLUTION_COLUMN_SQL)
+        await conn.execute(SNAPSHOT_STORAGE_TIERS_SQL)
+    
+    # Недостроенный (INVALID) индекс от прерванного CONCURRENTLY удаляем и строим заново
+    index_valid = await conn.fetchval('''
+        SELECT indisvalid FROM pg_index
+        WHERE indexrelid = to_regclass('idx_snapshots_hourly_created')
+    ''')
+    if index_valid:
+        return
+
+    # Индекс прямо сейчас строит другой процесс (бот и скрипты стартуют независимо)
+    building = await conn.fetchval('''
+        SELECT EXISTS (
+            SELECT 1 FROM pg_stat_progress_create_index
+            WHERE index_relid = to_regclass('idx_snapshots_hourly_created')
+        )
+    ''')
+    if building:
+        return
+
+    # CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции
+    await conn.execute("SELECT set_config('lock_timeout', $1, false)", lock_timeout)
+    try:
+        if index_valid is False:
+            await conn.execute('DROP INDEX CONCURRENTLY IF EXISTS idx_snapshots_hourly_created')
+        await conn.execute(SNAPSHOT_HOURLY_INDEX_SQL)
+    finally:
+        await conn.execute('RESET lock_timeout')
+
 
 class Database:
     def __init__(self):
@@ -52,6 +126,7 @@ class Database:
                     delta_comments_count INTEGER NOT NULL DEFAULT 0,
                     delta_reports_count INTEGER NOT NULL DEFAULT 0,
                     created_at TIMESTAMP NOT NULL,
+                    resolution VARCHAR(8) NOT NULL DEFAULT 'hour',
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             ''')
@@ -61,6 +136,13 @@ class Database:
             await conn.execute('CREATE INDEX IF NOT EXISTS idx_videos_created ON videos(video_created_at)')
             await conn.execute('CREATE INDEX IF NOT EXISTS idx_snapshots_video ON video_snapshots(video_id)')
             await conn.execute('CREATE INDEX IF NOT EXISTS idx_snapshots_created ON video_snapshots(created_at)')
+            
+            # Уровни хранения снапшотов (для баз, созданных до появления сжатия)
+            try:
+                await migrate_snapshot_storage(conn)
+            except asyncpg.exceptions.LockNotAvailableError:
+                # Бот работает и без сжатия: миграция повторится при следующем запуске
+                print("⚠️ video_snapshots занята, миграция хранения снапшотов пропущена")
     
     async def execute_query(self, query: str):
         """Выполнение SQL запроса"""
@@ -73,6 +155,25 @@ class Database:
                 print(f"Запрос: {query}")
                 return None
     
+    async def get_snapshot_storage_ranges(self):
+        """Диапазоны дат, снапшоты за которые сжаты до дневных ('day') или сжимаются ('partial')"""
+        async with self.pool.acquire() as conn:
+            if not await conn.fetchval("SELECT to_regclass('snapshot_storage_tiers') IS NOT NULL"):
+                # Миграция еще не выполнена - значит, ничего и не сжато
+                return []
+            
+            rows = await conn.fetch('''
+                SELECT resolution, MIN(day) AS date_from, MAX(day) AS date_to
+                FROM (
+                    SELECT day, resolution,
+                           day - (ROW_NUMBER() OVER (PARTITION BY resolution ORDER BY day))::int AS grp
+                    FROM snapshot_storage_tiers
+                ) t
+                GROUP BY resolution, grp
+                ORDER BY date_from
+            ''')
+            return [(row['resolution'], row['date_from'], row['date_to']) for row in rows]
+    
     async def close(self):
         """Закрытие соединения"""
         if self.pool:
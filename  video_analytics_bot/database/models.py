@@ -1,4 +1,4 @@
-from sqlalchemy import Column, BigInteger, Integer, DateTime, ForeignKey, func
+from sqlalchemy import Column, BigInteger, Integer, String, Date, DateTime, ForeignKey, func
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -35,7 +35,19 @@ class VideoSnapshot(Base):
     delta_comments_count = Column(Integer, nullable=False, default=0)
     delta_reports_count = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime, nullable=False)
+    # 'hour' - почасовой замер, 'day' - свернутый дневной
+    resolution = Column(String(8), nullable=False, default='hour')
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     
     # Связь многие-к-одному
-    video = relationship("Video", back_populates="snapshots")
\ No newline at end of file
+    video = relationship("Video", back_populates="snapshots")
+
+class SnapshotStorageTier(Base):
+    __tablename__ = 'snapshot_storage_tiers'
+    
+    day = Column(Date, primary_key=True)
+    # 'day' - день полностью свернут, 'partial' - сжатие дня не завершено
+    resolution = Column(String(8), nullable=False)
+    rows_before = Column(Integer, nullable=False, default=0)
+    rows_after = Column(Integer, nullable=False, default=0)
+    compacted_at = Column(DateTime, default=func.now())
\ No newline at end of file
@@ -0,0 +1,218 @@
+import asyncio
+import argparse
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+
+# Добавляем корневую директорию в путь Python
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import db_config, compaction_config
+from database.connection import migrate_snapshot_storage, SNAPSHOT_MAINTENANCE_LOCK_ID
+import asyncpg
+
+# Сворачиваем день в последнюю строку: счетчики берем на конец дня, приросты суммируем.
+# $1 - начало дня, $2 - следующий день, $3 - id видео батча.
+# Уже свернутая строка (resolution = 'day') участвует в агрегации: если почасовые
+# строки попали в свернутый день в обход load_json.py (он такие замеры пропускает,
+# т.к. не может отличить их от уже учтенных), они досворачиваются при повторном запуске.
+# Возвращаем id всех свернутых строк: удаляются только они, а замер,
+# записанный параллельно после агрегации, останется почасовым до следующего запуска.
+FOLD_DAY_SQL = '''
+    WITH groups AS (
+        SELECT video_id,
+               SUM(delta_views_count) AS delta_views,
+               SUM(delta_likes_count) AS delta_likes,
+               SUM(delta_comments_count) AS delta_comments,
+               SUM(delta_reports_count) AS delta_reports,
+               ARRAY_AGG(id ORDER BY created_at DESC, id DESC) AS ids,
+               COUNT(*) FILTER (WHERE resolution = 'hour') AS hourly_rows,
+               COUNT(*) FILTER (WHERE resolution = 'day') AS daily_rows
+        FROM video_snapshots
+        WHERE created_at >= $1 AND created_at < $2 AND video_id = ANY($3::bigint[])
+        GROUP BY video_id
+        HAVING BOOL_OR(resolution = 'hour')
+    )
+    UPDATE video_snapshots s
+    SET delta_views_count = g.delta_views,
+        delta_likes_count = g.delta_likes,
+        delta_comments_count = g.delta_comments,
+        delta_reports_count = g.delta_reports,
+        resolution = 'day',
+        updated_at = CURRENT_TIMESTAMP
+    FROM groups g
+    WHERE s.id = g.ids[1]
+    RETURNING g.ids[2:] AS folded_ids, g.hourly_rows, g.daily_rows
+'''
+
+DELETE_FOLDED_SQL = "DELETE FROM video_snapshots WHERE id = ANY($1::bigint[])"
+
+# Счетчики дня накапливаются: rows_before - сколько почасовых строк свернуто,
+# rows_after - сколько дневных строк получилось. Пока день не досжат, он 'partial'.
+UPSERT_TIER_SQL = '''
+    INSERT INTO snapshot_storage_tiers (day, resolution, rows_before, rows_after, compacted_at)
+    VALUES ($1, 'partial', $2, $3, CURRENT_TIMESTAMP)
+    ON CONFLICT (day) DO UPDATE
+    SET resolution = 'partial',
+        rows_before = snapshot_storage_tiers.rows_before + EXCLUDED.rows_before,
+        rows_after = snapshot_storage_tiers.rows_after + EXCLUDED.rows_after,
+        compacted_at = CURRENT_TIMESTAMP
+'''
+
+# Типичный запрос бота по старым данным - для оценки ускорения
+BENCHMARK_SQL = "SELECT SUM(delta_views_count) FROM video_snapshots WHERE created_at < $1"
+
+
+async def connect():
+    return await asyncpg.connect(
+        host=db_config.host,
+        port=db_config.port,
+        user=db_config.user,
+        password=db_config.password,
+        database=db_config.name
+    )
+
+
+async def bytes_per_row(conn) -> float:
+    """Средний размер строки вместе с индексами (по статистике планировщика)"""
+    return await conn.fetchval('''
+        SELECT pg_total_relation_size(oid)::float8 / reltuples
+        FROM pg_class
+        WHERE oid = 'video_snapshots'::regclass AND reltuples > 0
+    ''')
+
+
+async def benchmark(conn, cutoff: datetime, runs: int = 3) -> float:
+    """Лучшее время выполнения типичного запроса, мс"""
+    best = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        await conn.fetchval(BENCHMARK_SQL, cutoff)
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+async def compact_day(conn, day, batch_size: int, pause: float, lock_timeout: str):
+    """Сворачивание одного дня батчами по видео. Возвращает (почасовых строк свернуто, дневных строк добавлено)"""
+    day_start = datetime.combine(day, datetime.min.time())
+    day_end = day_start + timedelta(days=1)
+
+    video_ids = [row['video_id'] for row in await conn.fetch('''
+        SELECT DISTINCT video_id FROM video_snapshots
+        WHERE resolution = 'hour' AND created_at >= $1 AND created_at < $2
+        ORDER BY video_id
+    ''', day_start, day_end)]
+
+    rows_before = 0
+    rows_after = 0
+
+    for i in range(0, len(video_ids), batch_size):
+        batch = video_ids[i:i + batch_size]
+
+        # Короткая транзакция на батч: блокируются только строки этого дня и этих видео.
+        # Отметка уровня хранения коммитится вместе со свернутыми строками.
+        async with conn.transaction():
+            await conn.execute("SELECT set_config('lock_timeout', $1, true)", lock_timeout)
+            folded = await conn.fetch(FOLD_DAY_SQL, day_start, day_end, batch)
+            folded_ids = [snapshot_id for row in folded for snapshot_id in row['folded_ids']]
+            await conn.execute(DELETE_FOLDED_SQL, folded_ids)
+
+            batch_before = sum(row['hourly_rows'] for row in folded)
+            # Уже существовавшие дневные строки были учтены в прошлых запусках
+            batch_after = len(folded) - sum(row['daily_rows'] for row in folded)
+            await conn.execute(UPSERT_TIER_SQL, day, batch_before, batch_after)
+
+        rows_before += batch_before
+        rows_after += batch_after
+
+        if pause:
+            await asyncio.sleep(pause)
+
+    await conn.execute(
+        "UPDATE snapshot_storage_tiers SET resolution = 'day' WHERE day = $1", day
+    )
+
+    return rows_before, rows_after
+
+
+async def compact_snapshots(older_than_days: int, batch_size: int, pause: float, lock_timeout: str):
+    """Сворачивание почасовых снапшотов старше older_than_days в дневные"""
+    cutoff = datetime.combine(datetime.utcnow().date() - timedelta(days=older_than_days), datetime.min.time())
+
+    print(f"🗜 Сжатие снапшотов старше {cutoff.date()} (батч: {batch_size} видео)...")
+
+    conn = await connect()
+
+    try:
+        if not await conn.fetchval("SELECT pg_try_advisory_lock($1)", SNAPSHOT_MAINTENANCE_LOCK_ID):
+            print("❌ Идет загрузка или другое сжатие снапшотов, попробуйте позже")
+            return
+
+        try:
+            await migrate_snapshot_storage(conn, lock_timeout)
+        except asyncpg.exceptions.LockNotAvailableError:
+            print("❌ Таблица video_snapshots занята, попробуйте позже")
+            return
+
+        # Использует частичный индекс по почасовым строкам, сжатая история не сканируется
+        days = [row['day'] for row in await conn.fetch('''
+            SELECT DISTINCT DATE(created_at) AS day FROM video_snapshots
+            WHERE resolution = 'hour' AND created_at < $1
+            ORDER BY day
+        ''', cutoff)]
+
+        if not days:
+            print("✅ Нечего сжимать")
+            return
+
+        row_size = await bytes_per_row(conn)
+        query_before = await benchmark(conn, cutoff)
+
+        total_before = 0
+        total_after = 0
+
+        for day in days:
+            try:
+                rows_before, rows_after = await compact_day(conn, day, batch_size, pause, lock_timeout)
+            except asyncpg.exceptions.LockNotAvailableError:
+                # Закоммиченные батчи уже отмечены как 'partial', остаток досожмется при следующем запуске
+                print(f"   ⚠️ {day}: строки заблокированы, день сжат частично")
+                continue
+
+            total_before += rows_before
+            total_after += rows_after
+            print(f"   {day}: {rows_before} → {rows_after} строк")
+
+        # Помечаем место удаленных строк как свободное и обновляем статистику планировщика
+        await conn.execute("VACUUM (ANALYZE) video_snapshots")
+
+        query_after = await benchmark(conn, cutoff)
+        speedup = query_before / query_after if query_after else 0
+        deleted = total_before - total_after
+
+        print(f"✅ Сжатие завершено!")
+        print(f"   Строк: {total_before} → {total_after} (удалено {deleted})")
+        if row_size:
+            print(f"   Место для повторного использования (оценка, с индексами): "
+                  f"~{deleted * row_size / 1024 / 1024:.1f} MB")
+        print("   Файлы таблицы на диске не уменьшаются: освободившееся место займут новые снапшоты.")
+        print("   Чтобы вернуть место ОС, нужен VACUUM FULL или pg_repack.")
+        print(f"   Запрос по старым данным: {query_before:.1f} мс → {query_after:.1f} мс (x{speedup:.1f})")
+
+    finally:
+        await conn.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Сжатие старых почасовых снапшотов в дневные")
+    parser.add_argument('--older-than-days', type=int, default=compaction_config.hourly_retention_days)
+    parser.add_argument('--batch-size', type=int, default=compaction_config.batch_size)
+    parser.add_argument('--pause', type=float, default=compaction_config.batch_pause)
+    parser.add_argument('--lock-timeout', default=compaction_config.lock_timeout)
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    asyncio.run(compact_snapshots(args.older_than_days, args.batch_size, args.pause, args.lock_timeout))
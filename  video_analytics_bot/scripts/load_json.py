@@ -8,15 +8,16 @@ from datetime import datetime
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config import db_config
+from database.connection import migrate_snapshot_storage, SNAPSHOT_MAINTENANCE_LOCK_ID
 import asyncpg
 
-async def load_json_to_db(json_path: str = "videos.json"):
-    """Загрузка данных из JSON в базу данных"""
+async def load_json_to_db(json_path: str = "videos.json") -> bool:
+    """Загрузка данных из JSON в базу данных. Возвращает False, если загрузка не выполнялась"""
     
     if not os.path.exists(json_path):
         print(f"❌ Файл {json_path} не найден!")
         print("Пожалуйста, скачайте файл videos.json по ссылке из задания и поместите в корневую папку")
-        return
+        return False
     
     print(f"📂 Загрузка данных из {json_path}...")
     
@@ -35,8 +36,14 @@ async def load_json_to_db(json_path: str = "videos.json"):
     )
     
     try:
+        # Сжатие снапшотов меняет те же строки - не загружаем параллельно с ним
+        if not await conn.fetchval("SELECT pg_try_advisory_lock($1)", SNAPSHOT_MAINTENANCE_LOCK_ID):
+            print("❌ Идет сжатие снапшотов (scripts/compact_snapshots.py), попробуйте позже")
+            return False
+        
         video_count = 0
         snapshot_count = 0
+        skipped_snapshot_count = 0
         
         for video_data in data:
             # Вставляем видео
@@ -59,14 +66,22 @@ async def load_json_to_db(json_path: str = "videos.json"):
             )
             video_count += 1
             
-            # Загружаем снапшоты
+            # Загружаем снапшоты. Дни, уже свернутые в дневную строку для этого видео,
+            # пропускаем целиком: удаленные при сжатии замеры нельзя отличить от новых,
+            # а повторная вставка уже учтенных задвоила бы суммы приростов
             for snapshot in video_data.get('snapshots', []):
-                await conn.execute('''
+                status = await conn.execute('''
                     INSERT INTO video_snapshots 
                     (id, video_id, views_count, likes_count, comments_count, reports_count,
                      delta_views_count, delta_likes_count, delta_comments_count, delta_reports_count,
                      created_at, updated_at)
-                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12)
+                    SELECT $1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM video_snapshots
+                        WHERE video_id = $2 AND resolution = 'day'
+                          AND created_at >= DATE_TRUNC('day', $11::timestamp)
+                          AND created_at < DATE_TRUNC('day', $11::timestamp) + INTERVAL '1 day'
+                    )
                     ON CONFLICT (id) DO NOTHING
                 ''',
                     snapshot['id'],
@@ -82,7 +97,11 @@ async def load_json_to_db(json_path: str = "videos.json"):
                     datetime.fromisoformat(snapshot['created_at'].replace('Z', '+00:00')),
                     datetime.fromisoformat(snapshot['updated_at'].replace('Z', '+00:00'))
                 )
-                snapshot_count += 1
+                # 'INSERT 0 0' - снапшот уже есть или его день свернут
+                if status == 'INSERT 0 1':
+                    snapshot_count += 1
+                else:
+                    skipped_snapshot_count += 1
             
             # Показываем прогресс каждые 10 видео
             if video_count % 10 == 0:
@@ -91,6 +110,8 @@ async def load_json_to_db(json_path: str = "videos.json"):
         print(f"✅ Загрузка завершена!")
         print(f"   Всего загружено: {video_count} видео")
         print(f"   Всего загружено: {snapshot_count} снапшотов")
+        print(f"   Пропущено: {skipped_snapshot_count} снапшотов (уже загружены или день сжат)")
+        return True
         
     finally:
         await conn.close()
@@ -137,6 +158,7 @@ async def main():
                 delta_comments_count INTEGER NOT NULL DEFAULT 0,
                 delta_reports_count INTEGER NOT NULL DEFAULT 0,
                 created_at TIMESTAMP NOT NULL,
+                resolution VARCHAR(8) NOT NULL DEFAULT 'hour',
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
@@ -147,15 +169,21 @@ async def main():
         await conn.execute('CREATE INDEX IF NOT EXISTS idx_snapshots_video ON video_snapshots(video_id)')
         await conn.execute('CREATE INDEX IF NOT EXISTS idx_snapshots_created ON video_snapshots(created_at)')
         
+        # Уровни хранения снапшотов (для баз, созданных до появления сжатия)
+        try:
+            await migrate_snapshot_storage(conn)
+        except asyncpg.exceptions.LockNotAvailableError:
+            print("❌ Таблица video_snapshots занята, попробуйте позже")
+            return
+        
         print("✅ Таблицы созданы")
         
     finally:
         await conn.close()
     
     # Загружаем данные
-    await load_json_to_db()
-    
-    print("🎉 Готово!")
+    if await load_json_to_db():
+        print("🎉 Готово!")
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
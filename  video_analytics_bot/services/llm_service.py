@@ -2,14 +2,46 @@ import openai
 import json
 import re
 import os
-from typing import Tuple
+from typing import List, Optional, Tuple
 from config import llm_config
 
 class LLMService:
     def __init__(self):
         openai.api_key = llm_config.openai_api_key
     
-    async def generate_sql_from_text(self, user_query: str) -> Tuple[str, str]:
+    @staticmethod
+    def _storage_note(storage_ranges: Optional[List[tuple]]) -> str:
+        """Описание дат, снапшоты за которые сжаты до дневных"""
+        if not storage_ranges:
+            return ""
+        
+        def periods(resolution: str) -> str:
+            return ", ".join(
+                f"с {date_from} по {date_to}" if date_from != date_to else f"{date_from}"
+                for range_resolution, date_from, date_to in storage_ranges
+                if range_resolution == resolution
+            )
+        
+        note = ""
+        daily = periods('day')
+        partial = periods('partial')
+        if daily:
+            note += f"""
+Хранение снапшотов: за даты {daily} почасовые замеры свернуты в дневные
+(одна строка на видео за день, resolution = 'day'). В этих строках views_count и другие
+счетчики - значения на конец дня, а delta_* - суммарный прирост за весь день.
+Запросы с группировкой или фильтром по дню (DATE(created_at)) дают точные числа,
+фильтр по resolution для этого не нужен. Почасовая разбивка за эти даты недоступна.
+"""
+        if partial:
+            note += f"""
+За даты {partial} сжатие выполнено частично: у части видео строки уже дневные
+(resolution = 'day'), у остальных еще почасовые. Дневные суммы delta_* точны,
+почасовая разбивка за эти даты недоступна.
+"""
+        return note
+    
+    async def generate_sql_from_text(self, user_query: str, storage_ranges: Optional[List[tuple]] = None) -> Tuple[str, str]:
         """Генерация SQL запроса из естественного языка"""
         
         schema = """
@@ -38,8 +70,10 @@ class LLMService:
    - delta_comments_count (integer) - прирост комментариев за час
    - delta_reports_count (integer) - прирост жалоб за час
    - created_at (timestamp) - время замера
+   - resolution (varchar) - гранулярность строки: 'hour' или 'day'
    - updated_at (timestamp) - время обновления
         """
+        schema += self._storage_note(storage_ranges)
         
         examples = """
 Примеры преобразования: